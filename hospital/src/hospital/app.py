@@ -1,52 +1,92 @@
 import streamlit as st
 import os
-import json
+import asyncio
+import time
 import traceback
 import warnings
 import itertools
 import random
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import MappingProxyType
+from typing import Final
 from dotenv import load_dotenv
-import markdown
-import pdfkit
+import orjson
 
-# Filter out Pydantic deprecation warnings
-warnings.filterwarnings("ignore", category=DeprecationWarning, module="pydantic")
+# Filter out Pydantic deprecation warnings once per process, not on every rerun
+@st.cache_resource
+def install_warning_filters():
+    warnings.filterwarnings("ignore", category=DeprecationWarning, module="pydantic")
 
-# Load environment variables
-load_dotenv()
+install_warning_filters()
+
+# === Environment snapshot ===
+# Widget defaults and the variables the app checks, with their fallbacks
+ENV_DEFAULTS = {
+    "HOSPITAL_NAME": "",
+    "REGION": "",
+    "HOSPITAL_CAPACITY": "200",
+    "HISTORICAL_DATA_PERIOD": "2020-2024",
+    "CURRENT_SEASON": "Winter",
+    "SURVEILLANCE_DATA": "",
+    "CURRENT_STAFFING": "",
+    "BUDGET_CONSTRAINTS": "",
+    "CURRENT_INVENTORY": "",
+    "VENDOR_DETAILS": "",
+    "REGIONAL_LANGUAGES": "English",
+    "ADMINISTRATOR_NAME": "",
+    "EMERGENCY_CONTACTS": "",
+    "SERPER_API_KEY": "",
+    "GEMINI_API_KEY_1": "",
+    "MODEL_POOL": "gemini-1.5-flash",
+}
+
+@st.cache_resource
+def env_snapshot():
+    """Load .env once per process and freeze the values the UI reads."""
+    load_dotenv()
+    return MappingProxyType({k: os.environ.get(k, default) for k, default in ENV_DEFAULTS.items()})
+
+ENV = env_snapshot()
+
+SEASONS = ("Winter", "Summer", "Monsoon", "Post-Monsoon")
+SEASON_IDX = {season: i for i, season in enumerate(SEASONS)}
 
 # === Rotating Gemini Key Manager ===
-class GeminiKeyRotator:
-    def __init__(self):
-        self.keys = [
-            os.getenv("GEMINI_API_KEY"),
-            os.getenv("GEMINI_API_KEY_1"),
-            os.getenv("GEMINI_API_KEY_2"),
-            os.getenv("GEMINI_API_KEY_3"),
-            os.getenv("GEMINI_API_KEY_4"),
-            os.getenv("GEMINI_API_KEY_5"),
-            os.getenv("GEMINI_API_KEY_6"),
-            os.getenv("GEMINI_API_KEY_7"),
-        ]
-        self.keys = [k for k in self.keys if k]
-        if not self.keys:
-            raise ValueError("No valid Gemini API keys found in .env!")
-        self._cycle = itertools.cycle(self.keys)
-
-    def next_key(self):
-        return next(self._cycle)
-
-rotator = GeminiKeyRotator()
+GEMINI_KEY_VARS = (
+    "GEMINI_API_KEY",
+    "GEMINI_API_KEY_1",
+    "GEMINI_API_KEY_2",
+    "GEMINI_API_KEY_3",
+    "GEMINI_API_KEY_4",
+    "GEMINI_API_KEY_5",
+    "GEMINI_API_KEY_6",
+    "GEMINI_API_KEY_7",
+)
+
+@st.cache_resource
+def gemini_key_cycle():
+    """Collect the configured keys once per process and cycle through them."""
+    keys = [k for k in map(os.environ.get, GEMINI_KEY_VARS) if k]
+    if not keys:
+        raise ValueError("No valid Gemini API keys found in .env!")
+    return itertools.cycle(keys)
+
+def next_gemini_key():
+    return next(gemini_key_cycle())
 
 # === Helper: Select random model from MODEL_POOL ===
+@st.cache_resource
+def model_pool():
+    return tuple(m.strip() for m in ENV["MODEL_POOL"].split(","))
+
 def get_random_model():
-    models = os.getenv("MODEL_POOL", "gemini-1.5-flash").split(",")
-    return f"gemini/{random.choice(models).strip()}"
+    return f"gemini/{random.choice(model_pool())}"
 
 # Validate at least one key exists
 try:
-    gemini_api_key = rotator.next_key()
+    gemini_key_cycle()
 except ValueError as e:
     st.error(f"❌ {str(e)}")
     st.stop()
@@ -61,18 +101,50 @@ except ImportError:
         st.error("❌ Could not import HospitalSurgePredictionCrew. Please ensure the crew module is properly installed.")
         st.stop()
 
-# Streamlit config
-st.set_page_config(page_title="🏥 Hospital Surge Prediction System", layout="wide", initial_sidebar_state="expanded")
+# Create the results folder once per process rather than on every save
+@st.cache_resource
+def results_dir():
+    path = Path("results")
+    path.mkdir(exist_ok=True)
+    return path
+
+# Static page copy
+SIDEBAR_INFO_MD: Final[str] = """
+**Features:**
+- 🎪 Festival surge prediction
+- 🌫️ Pollution health risk assessment
+- 🦠 Epidemic surveillance
+- 👥 Staff optimization
+- 📦 Supply chain management
+- 📢 Patient communication
+"""
+REQUIRED_MD: Final[str] = """
+**Mandatory Information:**
+- Hospital Name
+- Region
+- Current Staffing Levels
+- Administrator Name
+"""
+TIPS_MD: Final[str] = """
+**Staffing Format:** 25 ICU doctors, 60 nurses
+**Inventory Format:** PPE kits: 500, Ventilators: 25
+"""
 
 # Custom CSS
-st.markdown("""
+CUSTOM_CSS = """
 <style>
 .main-header { background: linear-gradient(90deg, #1f77b4, #ff7f0e); padding: 1rem; border-radius: 10px; margin-bottom: 2rem; }
 .prediction-card { background: #f8f9fa; padding: 1rem; border-radius: 8px; border-left: 4px solid #1f77b4; margin: 1rem 0; }
 .error-card { background: #ffeaa7; padding: 1rem; border-radius: 8px; border-left: 4px solid #e17055; margin: 1rem 0; }
 .success-card { background: #d1f2eb; padding: 1rem; border-radius: 8px; border-left: 4px solid #00b894; margin: 1rem 0; }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+# Streamlit config
+st.set_page_config(page_title="🏥 Hospital Surge Prediction System", layout="wide", initial_sidebar_state="expanded")
+
+# Re-emit on every run: Streamlit drops elements a rerun does not render
+st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
 
 # Header
 st.markdown('<div class="main-header">', unsafe_allow_html=True)
@@ -84,15 +156,7 @@ st.markdown('</div>', unsafe_allow_html=True)
 # Sidebar
 with st.sidebar:
     st.header("ℹ️ System Information")
-    st.info("""
-    **Features:**
-    - 🎪 Festival surge prediction
-    - 🌫️ Pollution health risk assessment
-    - 🦠 Epidemic surveillance
-    - 👥 Staff optimization
-    - 📦 Supply chain management
-    - 📢 Patient communication
-    """)
+    st.info(SIDEBAR_INFO_MD)
     
     st.header("🔧 Settings")
     debug_mode = st.checkbox("Debug Mode", value=False)
@@ -102,7 +166,7 @@ with st.sidebar:
         st.subheader("Environment Status")
         required_vars = ["SERPER_API_KEY", "GEMINI_API_KEY_1"]
         for var in required_vars:
-            if os.getenv(var):
+            if ENV[var]:
                 st.success(f"✅ {var}")
             else:
                 st.error(f"❌ {var} missing")
@@ -110,148 +174,266 @@ with st.sidebar:
 # Main layout
 col1, col2 = st.columns([2,1])
 
-with col1:
+def analysis_date():
+    """Format today's date once per session, refreshing after local midnight."""
+    cached = st.session_state.get("_analysis_date")
+    if cached and time.monotonic() < cached[1]:
+        return cached[0]
+    now = datetime.now()
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    today = now.strftime("%Y-%m-%d")
+    st.session_state["_analysis_date"] = (today, time.monotonic() + (midnight - now).total_seconds())
+    return today
+
+@st.fragment
+def input_form():
+    """Render the input form; an invalid submit reruns only this fragment."""
     with st.form("hospital_inputs"):
         st.subheader("🏥 Hospital & Regional Information")
-        hospital_name = st.text_input("Hospital Name *", value=os.getenv("HOSPITAL_NAME",""))
-        region = st.text_input("Region *", value=os.getenv("REGION",""))
+        hospital_name = st.text_input("Hospital Name *", value=ENV["HOSPITAL_NAME"])
+        region = st.text_input("Region *", value=ENV["REGION"])
         hospital_type = st.selectbox("Hospital Type", ["Government", "Private", "Semi-Government", "Trust/NGO"])
-        hospital_capacity = st.number_input("Total Bed Capacity", min_value=10, max_value=5000, value=int(os.getenv("HOSPITAL_CAPACITY",200)))
+        hospital_capacity = st.number_input("Total Bed Capacity", min_value=10, max_value=5000, value=int(ENV["HOSPITAL_CAPACITY"]))
         
         st.subheader("📅 Temporal Information")
-        historical_data_period = st.text_input("Historical Data Period", value=os.getenv("HISTORICAL_DATA_PERIOD","2020-2024"))
-        current_season = st.selectbox("Current Season", ["Winter", "Summer", "Monsoon", "Post-Monsoon"], index=0)
+        historical_data_period = st.text_input("Historical Data Period", value=ENV["HISTORICAL_DATA_PERIOD"])
+        current_season = st.selectbox("Current Season", SEASONS, index=SEASON_IDX.get(ENV["CURRENT_SEASON"], 0))
         
         st.subheader("🦠 Disease Surveillance & Monitoring")
-        surveillance_data = st.text_area("Current Disease Surveillance Data", value=os.getenv("SURVEILLANCE_DATA",""), height=100)
+        surveillance_data = st.text_area("Current Disease Surveillance Data", value=ENV["SURVEILLANCE_DATA"], height=100)
         
         st.subheader("👥 Staffing & Human Resources")
-        current_staffing = st.text_area("Current Staffing Levels *", value=os.getenv("CURRENT_STAFFING",""), height=80)
-        budget_constraints = st.text_input("Budget Constraints", value=os.getenv("BUDGET_CONSTRAINTS",""))
+        current_staffing = st.text_area("Current Staffing Levels *", value=ENV["CURRENT_STAFFING"], height=80)
+        budget_constraints = st.text_input("Budget Constraints", value=ENV["BUDGET_CONSTRAINTS"])
         
         st.subheader("📦 Inventory & Supply Chain")
-        current_inventory = st.text_area("Current Inventory Levels", value=os.getenv("CURRENT_INVENTORY",""), height=100)
-        vendor_details = st.text_area("Vendor & Supplier Information", value=os.getenv("VENDOR_DETAILS",""), height=80)
+        current_inventory = st.text_area("Current Inventory Levels", value=ENV["CURRENT_INVENTORY"], height=100)
+        vendor_details = st.text_area("Vendor & Supplier Information", value=ENV["VENDOR_DETAILS"], height=80)
         
         st.subheader("📢 Communication & Administration")
-        regional_languages = st.text_input("Regional Languages", value=os.getenv("REGIONAL_LANGUAGES","English"))
-        administrator_name = st.text_input("Administrator Name *", value=os.getenv("ADMINISTRATOR_NAME",""))
-        emergency_contacts = st.text_area("Emergency Contacts", value=os.getenv("EMERGENCY_CONTACTS",""), height=100)
+        regional_languages = st.text_input("Regional Languages", value=ENV["REGIONAL_LANGUAGES"])
+        administrator_name = st.text_input("Administrator Name *", value=ENV["ADMINISTRATOR_NAME"])
+        emergency_contacts = st.text_area("Emergency Contacts", value=ENV["EMERGENCY_CONTACTS"], height=100)
         
-        current_date = datetime.now().strftime("%Y-%m-%d")
+        current_date = analysis_date()
         st.info(f"📅 Analysis Date: {current_date}")
         
         st.markdown("---")
         submitted = st.form_submit_button("🚀 Start Hospital Surge Prediction Analysis")
 
-with col2:
-    st.subheader("📋 Quick Guidelines")
-    with st.expander("🎯 Required Fields"):
-        st.markdown("""
-        **Mandatory Information:**
-        - Hospital Name
-        - Region 
-        - Current Staffing Levels
-        - Administrator Name
-        """)
-    with st.expander("💡 Input Tips"):
-        st.markdown("""
-        **Staffing Format:** 25 ICU doctors, 60 nurses
-        **Inventory Format:** PPE kits: 500, Ventilators: 25
-        """)
-
-# Run analysis
-if submitted:
+    if not submitted:
+        return
     missing_fields = []
     for field_name, value in [("Hospital Name", hospital_name), ("Region", region), ("Current Staffing", current_staffing), ("Administrator Name", administrator_name)]:
         if not value:
             missing_fields.append(field_name)
     if missing_fields:
         st.error(f"⚠️ Missing Required Fields: {', '.join(missing_fields)}")
-    else:
-        inputs = {
-            "hospital_name": hospital_name,
-            "region": region,
-            "historical_data_period": historical_data_period,
-            "current_season": current_season,
-            "surveillance_data": surveillance_data,
-            "current_staffing": current_staffing,
-            "budget_constraints": budget_constraints,
-            "current_inventory": current_inventory,
-            "vendor_details": vendor_details,
-            "regional_languages": regional_languages,
-            "administrator_name": administrator_name,
-            "emergency_contacts": emergency_contacts,
-            "current_date": current_date,
-            "api_keys": {"gemini": gemini_api_key, "serper": os.getenv("SERPER_API_KEY","")},
-        }
+        return
+    st.session_state["pending_inputs"] = {
+        "hospital_name": hospital_name,
+        "region": region,
+        "historical_data_period": historical_data_period,
+        "current_season": current_season,
+        "surveillance_data": surveillance_data,
+        "current_staffing": current_staffing,
+        "budget_constraints": budget_constraints,
+        "current_inventory": current_inventory,
+        "vendor_details": vendor_details,
+        "regional_languages": regional_languages,
+        "administrator_name": administrator_name,
+        "emergency_contacts": emergency_contacts,
+        "current_date": current_date,
+        "api_keys": {"gemini": next_gemini_key(), "serper": ENV["SERPER_API_KEY"]},
+    }
+    # A valid submit needs the full page to run the analysis below the columns
+    st.rerun()
+
+with col1:
+    input_form()
+
+with col2:
+    st.subheader("📋 Quick Guidelines")
+    with st.expander("🎯 Required Fields"):
+        st.markdown(REQUIRED_MD)
+    with st.expander("💡 Input Tips"):
+        st.markdown(TIPS_MD)
+
+# Run analysis
+@st.cache_resource
+def executor():
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="hospital-crew")
+
+# Seconds an analysis may run before the app gives up on it
+ANALYSIS_TIMEOUT = 30 * 60
+ANALYSIS_TIMEOUT_MSG = f"Analysis did not finish within {ANALYSIS_TIMEOUT // 60} minutes"
+
+def run_analysis(inputs):
+    """Run the pipeline on a fresh crew, so concurrent sessions never share agent or task state.
+
+    The deadline frees this worker even if a task hangs; kickoffs already running in the
+    crew's own pool are left to finish on their own.
+    """
+    try:
+        return asyncio.run(asyncio.wait_for(HospitalSurgePredictionCrew().run_pipeline(inputs), ANALYSIS_TIMEOUT))
+    except asyncio.TimeoutError:
+        raise TimeoutError(ANALYSIS_TIMEOUT_MSG) from None
+
+inputs = st.session_state.pop("pending_inputs", None)
+if inputs:
+    previous = st.session_state.get("analysis")
+    if previous:
+        # Only drops a run that has not started yet; a running analysis finishes in the background
+        previous["future"].cancel()
+    st.session_state.pop("last_result", None)
+    st.session_state["analysis"] = {
+        "future": executor().submit(run_analysis, inputs),
+        "started": time.monotonic(),
+        "inputs": inputs,
+        "save_results": save_results,
+    }
+
+@st.fragment(run_every=2)
+def analysis_status():
+    """Poll the running analysis and hand its outcome to the results panel."""
+    analysis = st.session_state["analysis"]
+    future = analysis["future"]
+    inputs = analysis["inputs"]
+    if not future.done():
+        if time.monotonic() - analysis["started"] < ANALYSIS_TIMEOUT:
+            st.info("🤖 Running AI-powered hospital surge prediction analysis...")
+            return
+        # Don't rely on the worker to time out: report the run as failed and stop polling
+        future.cancel()
+        del st.session_state["analysis"]
+        st.session_state["last_result"] = {"inputs": inputs, "error": ANALYSIS_TIMEOUT_MSG, "traceback": ""}
+        st.rerun()
+    del st.session_state["analysis"]
+    try:
+        result = future.result()
         
-        if debug_mode:
-            st.json(inputs)
+        # Save JSON results
+        results_file = None
+        if analysis["save_results"]:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            results_file = results_dir() / f"hospital_prediction_{timestamp}.json"
+            results_file.write_bytes(orjson.dumps(
+                {"inputs": inputs, "results": str(result), "timestamp": timestamp},
+                option=orjson.OPT_INDENT_2,
+            ))
         
-        with st.spinner("🤖 Running AI-powered hospital surge prediction analysis..."):
-            try:
-                crew = HospitalSurgePredictionCrew()
-                result = crew.hospital_surge_crew().kickoff(inputs=inputs)
-                st.success("✅ Analysis completed successfully!")
-                
-                st.subheader("📊 Prediction Results")
-                if hasattr(result, "raw"):
-                    st.text(result.raw)
-                elif hasattr(result, "json"):
-                    st.json(result.json)
-                
-                # Save JSON results
-                if save_results:
-                    os.makedirs("results", exist_ok=True)
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    results_file = f"results/hospital_prediction_{timestamp}.json"
-                    with open(results_file,"w") as f:
-                        json.dump({"inputs": inputs, "results": str(result)}, f, indent=2)
-                    st.info(f"💾 Results saved to: {results_file}")
-                
-                # === PDF Download Integration for Windows ===
-                md_file = "resources/reports/hospital_preparedness_report.md"
-                pdf_file = "resources/reports/hospital_preparedness_report.pdf"
-                
-                # Path to wkhtmltopdf.exe
-                wkhtmltopdf_path = r"C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe"
-                pdf_config = pdfkit.configuration(wkhtmltopdf=wkhtmltopdf_path)
-                
-                if os.path.exists(md_file):
-                    with open(md_file, "r", encoding="utf-8") as f:
-                        md_text = f.read()
-                    html_text = markdown.markdown(md_text, extensions=["tables", "fenced_code"])
-                    html_template = f"""
-                    <html>
-                    <head>
-                    <style>
-                    body {{ font-family: Arial, sans-serif; margin: 30px; line-height: 1.5; }}
-                    h1, h2, h3 {{ color: #2E86C1; }}
-                    table {{ border-collapse: collapse; width: 100%; margin-bottom: 20px; }}
-                    table, th, td {{ border: 1px solid black; padding: 8px; }}
-                    th {{ background-color: #D6EAF8; }}
-                    </style>
-                    </head>
-                    <body>
-                    {html_text}
-                    </body>
-                    </html>
-                    """
-                    pdfkit.from_string(html_template, pdf_file, configuration=pdf_config)
-                    
-                    with open(pdf_file, "rb") as f:
-                        pdf_bytes = f.read()
-                    st.download_button(
-                        label="📄 Download Hospital Preparedness Report (PDF)",
-                        data=pdf_bytes,
-                        file_name="hospital_preparedness_report.pdf",
-                        mime="application/pdf"
-                    )
-                else:
-                    st.info("📁 Hospital report not generated yet. Run the analysis first.")
-                    
-            except Exception as e:
-                st.error(f"❌ Error: {str(e)}")
-                if debug_mode:
-                    st.text(traceback.format_exc())
+        st.session_state["last_result"] = {"inputs": inputs, "result": result, "results_file": results_file}
+    except Exception as e:
+        st.session_state["last_result"] = {
+            "inputs": inputs,
+            "error": str(e),
+            "traceback": "".join(traceback.format_exception(e)),
+        }
+    # Full rerun so the results panel picks up the outcome and polling stops
+    st.rerun()
+
+if "analysis" in st.session_state:
+    analysis_status()
+
+# === PDF Download Integration for Windows ===
+REPORT_MD_FILE = "resources/reports/hospital_preparedness_report.md"
+REPORT_PDF_FILE = Path("resources/reports/hospital_preparedness_report.pdf")
+# Path to wkhtmltopdf.exe
+WKHTMLTOPDF_PATH = r"C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe"
+
+# Static page wrapper around the converted report body
+REPORT_HTML_HEAD = """
+<html>
+<head>
+<style>
+body { font-family: Arial, sans-serif; margin: 30px; line-height: 1.5; }
+h1, h2, h3 { color: #2E86C1; }
+table { border-collapse: collapse; width: 100%; margin-bottom: 20px; }
+table, th, td { border: 1px solid black; padding: 8px; }
+th { background-color: #D6EAF8; }
+</style>
+</head>
+<body>
+"""
+REPORT_HTML_TAIL = """
+</body>
+</html>
+"""
+
+@st.cache_resource
+def pdf_config():
+    """Resolve and validate the wkhtmltopdf binary once per process."""
+    import pdfkit
+    return pdfkit.configuration(wkhtmltopdf=WKHTMLTOPDF_PATH)
+
+@st.cache_data(ttl="1h", max_entries=32)
+def render_pdf(md_file, mtime, size):
+    """Convert the markdown report to PDF and return its path; mtime and size key the cache."""
+    # A PDF written after the last report update is still current
+    try:
+        if REPORT_PDF_FILE.stat().st_mtime >= mtime:
+            return REPORT_PDF_FILE
+    except FileNotFoundError:
+        pass
+    
+    # Only pay for the PDF toolchain once there is a report to convert
+    import markdown
+    import pdfkit
+    
+    with open(md_file, "r", encoding="utf-8") as f:
+        md_text = f.read()
+    html_text = markdown.markdown(md_text, extensions=["tables", "fenced_code"])
+    html_template = REPORT_HTML_HEAD + html_text + REPORT_HTML_TAIL
+    pdfkit.from_string(html_template, str(REPORT_PDF_FILE), configuration=pdf_config())
+    return REPORT_PDF_FILE
+
+@st.fragment
+def results_panel(debug_mode):
+    """Render the last analysis; the download button reruns only this fragment."""
+    last_result = st.session_state.get("last_result")
+    if not last_result:
+        return
+    if debug_mode:
+        with st.expander("🔧 Debug", expanded=False):
+            st.json(last_result["inputs"], expanded=False)
+    if "error" in last_result:
+        st.error(f"❌ Error: {last_result['error']}")
+        if debug_mode:
+            st.text(last_result["traceback"])
+        return
+    result = last_result["result"]
+    st.success("✅ Analysis completed successfully!")
+    
+    st.subheader("📊 Prediction Results")
+    if hasattr(result, "raw"):
+        st.text(result.raw)
+    elif hasattr(result, "json"):
+        st.json(result.json)
+    
+    if last_result["results_file"]:
+        st.info(f"💾 Results saved to: {last_result['results_file']}")
+    
+    try:
+        stat = os.stat(REPORT_MD_FILE)
+    except FileNotFoundError:
+        st.info("📁 Hospital report not generated yet. Run the analysis first.")
+        return
+    
+    try:
+        pdf_file = render_pdf(REPORT_MD_FILE, stat.st_mtime, stat.st_size)
+        # The button consumes the handle while it is built, so closing it afterwards is safe
+        with pdf_file.open("rb") as pdf:
+            st.download_button(
+                label="📄 Download Hospital Preparedness Report (PDF)",
+                data=pdf,
+                file_name="hospital_preparedness_report.pdf",
+                mime="application/pdf"
+            )
+    except ImportError:
+        st.warning("⚠️ PDF export unavailable: install the markdown and pdfkit packages.")
+    except Exception as e:
+        st.error(f"❌ Error: {str(e)}")
+        if debug_mode:
+            st.text(traceback.format_exc())
+
+results_panel(debug_mode)
@@ -1,50 +1,328 @@
 import os
+import asyncio
+import contextlib
+import contextvars
 import random
-import itertools
+import functools
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import httpx
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from types import MappingProxyType
 from dotenv import load_dotenv
 from crewai import Agent, Task, Crew, Process, LLM
 from crewai.project import CrewBase, agent, task, crew
-from crewai_tools import SerperDevTool, ScrapeWebsiteTool, FileWriterTool, FileReadTool
+from litellm.llms.custom_httpx.http_handler import HTTPHandler
 
 # Load environment variables
 load_dotenv()
 
 # === Rotating API Key Manager ===
-class GeminiKeyRotator:
-    def __init__(self):
-        self.keys = [
-            os.getenv("GEMINI_API_KEY_1"),
-            os.getenv("GEMINI_API_KEY_2"),
-            os.getenv("GEMINI_API_KEY_3"),
-            os.getenv("GEMINI_API_KEY_4"),
-            os.getenv("GEMINI_API_KEY_5"),
-            os.getenv("GEMINI_API_KEY_6"),
-            os.getenv("GEMINI_API_KEY_7"),
-        ]
-        self.keys = [k for k in self.keys if k]  # filter None
-        if not self.keys:
-            raise ValueError("No valid Gemini API keys found!")
-        self._cycle = itertools.cycle(self.keys)
+_GEMINI_KEY_VARS = (
+    "GEMINI_API_KEY_1",
+    "GEMINI_API_KEY_2",
+    "GEMINI_API_KEY_3",
+    "GEMINI_API_KEY_4",
+    "GEMINI_API_KEY_5",
+    "GEMINI_API_KEY_6",
+    "GEMINI_API_KEY_7",
+)
+
+# Seconds a key sits out of the rotation after Gemini rate-limits it
+KEY_COOLDOWN = 60.0
+
+# Per-key load, guarded by _key_lock: requests currently in flight, when the key was last
+# picked for a request, and the time.monotonic() at which a rate-limited key may be used again
+_key_lock = threading.Lock()
+_key_inflight: dict[str, int] = {}
+_key_last_picked: dict[str, float] = {}
+_key_cooldowns: dict[str, float] = {}
+
+@functools.lru_cache(maxsize=1)
+def _gemini_keys() -> tuple[str, ...]:
+    keys = tuple(k for k in map(os.environ.get, _GEMINI_KEY_VARS) if k)  # filter None
+    if not keys:
+        raise ValueError("No valid Gemini API keys found!")
+    return keys
+
+def next_gemini_key():
+    """Key for the next Gemini request: not cooling down, fewest requests in flight, least
+    recently picked.
 
-    def next_key(self):
-        return next(self._cycle)
+    The last tiebreak makes this plain round-robin while every key is idle.
+    """
+    with _key_lock:
+        now = time.monotonic()
+        key = min(_gemini_keys(), key=lambda k: (
+            _key_cooldowns.get(k, 0.0) > now,
+            _key_inflight.get(k, 0),
+            _key_last_picked.get(k, 0.0),
+        ))
+        _key_last_picked[key] = now
+        return key
 
-rotator = GeminiKeyRotator()
+def mark_key_rate_limited(key: str):
+    with _key_lock:
+        _key_cooldowns[key] = time.monotonic() + KEY_COOLDOWN
+
+@contextlib.contextmanager
+def _key_in_flight(key: str):
+    with _key_lock:
+        _key_inflight[key] = _key_inflight.get(key, 0) + 1
+    try:
+        yield
+    finally:
+        with _key_lock:
+            _key_inflight[key] -= 1
+
+# === Shared tools ===
+# None of these keep per-agent state, so every agent can share one instance. crewai_tools is
+# imported on first use: it takes seconds to load and importing this module should not pay for it
+@functools.lru_cache(maxsize=None)
+def _shared_tool(name: str):
+    import crewai_tools
+    return getattr(crewai_tools, name)()
+
+def _file_tools():
+    return [_shared_tool("FileWriterTool"), _shared_tool("FileReadTool")]
 
 # === Helper: Create LLM with rotating key and random model ===
-def create_rotating_llm():
-    models = os.getenv("MODEL_POOL", "1.5-flash").split(",")
-    model = random.choice(models).strip()
-    os.environ["GEMINI_API_KEY"] = rotator.next_key()
-    return LLM(
+# One pooled HTTP/2 connection to Gemini shared by every LLM, so concurrent tasks multiplex
+# over it instead of each paying its own TLS handshake.
+# Responses are streamed, so the read timeout is an idle watchdog: a stalled Gemini stream
+# fails after LLM_IDLE_TIMEOUT seconds instead of holding its worker for 120s. It also bounds
+# the wait for the first chunk, so it has to cover Gemini's time to first token
+LLM_IDLE_TIMEOUT = float(os.getenv("LLM_IDLE_TIMEOUT", "15"))
+
+class _StreamGuard(httpx.SyncByteStream):
+    """Response body that records a transport error on the reading thread before re-raising it.
+
+    crewai returns the text received so far when a stream breaks off, as if it were the whole
+    answer; CachedLLM checks the recorded error to fail such a call instead.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def __iter__(self):
+        try:
+            yield from self._stream
+        except httpx.TransportError as e:
+            _request_key.stream_error = e
+            raise
+
+    def close(self):
+        self._stream.close()
+
+class _GuardedTransport(httpx.HTTPTransport):
+    def handle_request(self, request):
+        response = super().handle_request(request)
+        response.stream = _StreamGuard(response.stream)
+        return response
+
+_GEMINI_HTTP = HTTPHandler(
+    client=httpx.Client(
+        transport=_GuardedTransport(
+            http2=True,
+            limits=httpx.Limits(max_connections=16, max_keepalive_connections=16),
+        ),
+        timeout=httpx.Timeout(120.0, connect=5.0, read=LLM_IDLE_TIMEOUT),
+    )
+)
+
+# === LLM response cache ===
+# Off unless LLM_CACHE=1: a hit replays an earlier run's answer instead of asking the model again
+LLM_CACHE = os.getenv("LLM_CACHE", "0") == "1"
+PROMPT_VERSION = "v1"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".llm_cache.sqlite3")
+LLM_CACHE_TTL = 7 * 24 * 3600  # one week, in seconds
+
+_llm_cache_lock = threading.Lock()
+
+# The Gemini request running on this thread: its API key, read when litellm's completion params
+# are built, and any transport error that cut its response stream short
+_request_key = threading.local()
+
+_RATE_LIMITED = re.compile(r"\b429\b|rate.?limit|resource.?exhausted", re.I)
+
+# === Gemini concurrency control ===
+# AIMD cap on concurrent Gemini requests across all crews in the process: it halves on a
+# rate-limit error and grows back by one after every LLM_AIMD_STEP successful calls
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_AIMD_STEP = 5
+
+class _AIMDLimiter:
+    def __init__(self, max_limit: int, step: int):
+        self.max_limit = max_limit
+        self.limit = max_limit
+        self.step = step
+        self._in_flight = 0
+        self._successes = 0
+        self._cond = threading.Condition()
+
+    @contextlib.contextmanager
+    def slot(self):
+        with self._cond:
+            self._cond.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify()
+
+    def on_success(self):
+        with self._cond:
+            self._successes += 1
+            if self._successes >= self.step and self.limit < self.max_limit:
+                self.limit += 1
+                self._successes = 0
+                self._cond.notify()
+
+    def on_rate_limited(self):
+        with self._cond:
+            self.limit = max(1, self.limit // 2)
+            self._successes = 0
+
+_GEMINI_LIMITER = _AIMDLimiter(LLM_MAX_CONCURRENCY, LLM_AIMD_STEP)
+
+@functools.lru_cache(maxsize=1)
+def _llm_cache_db():
+    # Shared by the pipeline's worker threads; writes are serialized by _llm_cache_lock
+    db = sqlite3.connect(LLM_CACHE_PATH, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS llm_cache ("
+        "inputHash TEXT PRIMARY KEY, response TEXT, expiresAt INTEGER)"
+    )
+    return db
+
+def _run_inputs(task):
+    """Inputs of the crew kickoff that the task's agent is running in, if any.
+
+    The app passes rotating API keys alongside the inputs; they are left out so a run
+    does not miss the cache just because it drew another key.
+    """
+    crew = getattr(getattr(task, "agent", None), "crew", None)
+    inputs = getattr(crew, "_inputs", None)
+    if inputs is None:
+        return None
+    return {k: v for k, v in inputs.items() if k != "api_keys"}
+
+class CachedLLM(LLM):
+    """LLM that can reuse responses for identical requests made with identical crew inputs.
+
+    The task prompts do not interpolate the crew inputs, so the same messages are sent for
+    every hospital, region and date; the key therefore includes the inputs of the run the
+    call belongs to. Calls that carry tools, or that cannot be tied to a run, are never
+    cached.
+    """
+
+    def _cache_key(self, messages, inputs) -> str:
+        payload = json.dumps([self.model, self.temperature, messages, inputs, PROMPT_VERSION], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _prepare_completion_params(self, messages, tools=None):
+        params = super()._prepare_completion_params(messages, tools)
+        params["api_key"] = getattr(_request_key, "value", None) or self.api_key
+        return params
+
+    def _call_upstream(self, *args):
+        # crewai retries an unsupported 'stop' parameter by calling self.call() from inside
+        # super().call(); that nested request keeps the outer one's limiter slot and key
+        if getattr(_request_key, "value", None):
+            return super().call(*args)
+        # Choose the key per request, not per agent: agents live as long as their crew, so a
+        # key picked at build time would keep being used after it was rate-limited.
+        # It is picked once a limiter slot is free, so the in-flight counts are current
+        key = None
+        _request_key.stream_error = None
+        try:
+            with _GEMINI_LIMITER.slot():
+                key = next_gemini_key()
+                _request_key.value = key
+                with _key_in_flight(key):
+                    response = super().call(*args)
+            # A truncated answer is a failure: never cache it or count it as a success
+            if _request_key.stream_error is not None:
+                raise _request_key.stream_error
+        except Exception as e:
+            if key and _RATE_LIMITED.search(str(e)):
+                mark_key_rate_limited(key)
+                _GEMINI_LIMITER.on_rate_limited()
+            raise
+        finally:
+            _request_key.value = None
+            _request_key.stream_error = None
+        _GEMINI_LIMITER.on_success()
+        return response
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, from_task=None, from_agent=None):
+        inputs = _run_inputs(from_task)
+        if not LLM_CACHE or tools or available_functions or inputs is None:
+            return self._call_upstream(messages, tools, callbacks, available_functions, from_task, from_agent)
+
+        key = self._cache_key(messages, inputs)
+        with _llm_cache_lock:
+            row = _llm_cache_db().execute(
+                "SELECT response FROM llm_cache WHERE inputHash = ? AND expiresAt > ?",
+                (key, int(time.time())),
+            ).fetchone()
+        if row is not None:
+            return row[0]
+
+        response = self._call_upstream(messages, tools, callbacks, available_functions, from_task, from_agent)
+        # Empty responses are errors upstream; don't pin them in the cache
+        if isinstance(response, str) and response:
+            with _llm_cache_lock, _llm_cache_db() as db:
+                db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (inputHash, response, expiresAt) VALUES (?, ?, ?)",
+                    (key, response, int(time.time()) + LLM_CACHE_TTL),
+                )
+        return response
+
+# MODEL_POOL is read once; models are picked from the tuple per LLM
+_MODELS = tuple(m.strip() for m in os.getenv("MODEL_POOL", "1.5-flash").split(","))
+_LLM_CONFIG = MappingProxyType({"request_timeout": 120, "max_retries": 3, "retry_delay": 2})
+
+# One LLM per model, shared by every agent. CachedLLM picks the API key per request
+@functools.lru_cache(maxsize=None)
+def _gemini_llm(model: str) -> CachedLLM:
+    return CachedLLM(
         model=f"gemini/{model}",
         temperature=0.6,
         max_tokens=4000,
-        config={"request_timeout": 120, "max_retries": 3, "retry_delay": 2}
+        stream=True,
+        config=dict(_LLM_CONFIG),
+        client=_GEMINI_HTTP,
     )
 
+def create_rotating_llm():
+    return _gemini_llm(random.choice(_MODELS))
+
+# Upper bound on tasks (and so LLM conversations) running at once in one run_pipeline() call
+MAX_CONCURRENT_TASKS = int(os.getenv("MAX_CONCURRENT_TASKS", "3"))
+
+# Upper bound on pipelines running at once in the process (see main.run_many())
+MAX_CONCURRENT_RUNS = int(os.getenv("MAX_CONCURRENT_RUNS", "8"))
+
+# Worker threads for the blocking kickoff() calls, reused across runs instead of
+# relying on each event loop's default executor (which asyncio.run() tears down).
+# Sized so every concurrent run can use its full MAX_CONCURRENT_TASKS; threads start on demand
+_CREW_POOL = ThreadPoolExecutor(
+    max_workers=MAX_CONCURRENT_TASKS * MAX_CONCURRENT_RUNS, thread_name_prefix="hospital-task"
+)
+
+# "merged" runs one combined forecaster instead of the festival/pollution/epidemic trio
+FORECAST_MODE = os.getenv("FORECAST_MODE", "split")
+
 # === Crew Definition ===
 @CrewBase
 class HospitalSurgePredictionCrew:
@@ -52,6 +330,13 @@ class HospitalSurgePredictionCrew:
 
     DATA_PATH = "resources/data"
 
+    def __init__(self, merged_forecast: bool | None = None):
+        # Fast path: one forecaster turn instead of three separate LLM requests.
+        # Defaults to FORECAST_MODE=merged so low-risk deployments can opt in without code changes
+        if merged_forecast is None:
+            merged_forecast = FORECAST_MODE == "merged"
+        self.merged_forecast = merged_forecast
+
     # ---------- Agents ----------
     @agent
     def festival_event_forecaster(self) -> Agent:
@@ -68,7 +353,7 @@ class HospitalSurgePredictionCrew:
             goal="Predict patient surges linked to cultural events and festivals.",
             backstory="Analyzes Indian cultural calendars, holidays, and historical admissions data.",
             llm=create_rotating_llm(),
-            tools=[FileWriterTool(), FileReadTool()],
+            tools=_file_tools(),
             verbose=True,
             execute=forecast_festival_surge
         )
@@ -88,7 +373,7 @@ class HospitalSurgePredictionCrew:
             goal="Monitor AQI, pollution, and weather to forecast health risks.",
             backstory="Predicts respiratory and cardiac surges based on environmental data.",
             llm=create_rotating_llm(),
-            tools=[FileWriterTool(), FileReadTool()],
+            tools=_file_tools(),
             verbose=True,
             execute=forecast_pollution_risks
         )
@@ -108,11 +393,22 @@ class HospitalSurgePredictionCrew:
             goal="Monitor current infectious disease trends in the region.",
             backstory="Tracks COVID-19, influenza, and other outbreaks.",
             llm=create_rotating_llm(),
-            tools=[FileWriterTool(), FileReadTool(), SerperDevTool()],
+            tools=_file_tools() + [_shared_tool("SerperDevTool")],
             verbose=True,
             execute=generate_epidemic_report
         )
 
+    @agent
+    def combined_forecaster(self) -> Agent:
+        return Agent(
+            role="Combined Surge Forecaster",
+            goal="Forecast festival, pollution, and epidemic driven surges in a single report.",
+            backstory="Covers cultural events, environmental health risks, and outbreak trends at once when time is short.",
+            llm=create_rotating_llm(),
+            tools=_file_tools() + [_shared_tool("SerperDevTool")],
+            verbose=True,
+        )
+
     @agent
     def staffing_optimizer(self) -> Agent:
         def generate_staffing_plan():
@@ -128,7 +424,7 @@ class HospitalSurgePredictionCrew:
             goal="Recommend optimal staffing schedules during surges.",
             backstory="Uses surge predictions to optimize staff allocation.",
             llm=create_rotating_llm(),
-            tools=[FileWriterTool(), FileReadTool()],
+            tools=_file_tools(),
             verbose=True,
             execute=generate_staffing_plan
         )
@@ -148,7 +444,7 @@ class HospitalSurgePredictionCrew:
             goal="Anticipate and manage hospital inventory needs.",
             backstory="Forecasts demand for medicines, PPE, oxygen, ICU beds, ventilators.",
             llm=create_rotating_llm(),
-            tools=[FileWriterTool(), FileReadTool()],
+            tools=_file_tools(),
             verbose=True,
             execute=generate_inventory_plan
         )
@@ -170,7 +466,7 @@ class HospitalSurgePredictionCrew:
             goal="Generate advisories and communication materials in multiple languages.",
             backstory="Creates preventive guidance and hospital visit protocols.",
             llm=create_rotating_llm(),
-            tools=[FileWriterTool(), FileReadTool()],
+            tools=_file_tools(),
             verbose=True,
             execute=generate_advisories
         )
@@ -190,12 +486,30 @@ class HospitalSurgePredictionCrew:
             goal="Integrate outputs into a unified hospital preparedness report.",
             backstory="Synthesizes predictions into a comprehensive plan.",
             llm=create_rotating_llm(),
-            tools=[FileWriterTool(), FileReadTool()],
+            tools=_file_tools(),
             verbose=True,
             execute=integrate_reports
         )
 
     # ---------- Tasks ----------
+    def _forecast_tasks(self) -> list[Task]:
+        """Independent forecasting tasks that only need the raw inputs."""
+        if self.merged_forecast:
+            return [self.combined_forecast_analysis()]
+        return [
+            self.festival_event_analysis(),
+            self.pollution_health_risk_assessment(),
+            self.epidemic_outbreak_surveillance(),
+        ]
+
+    def _planning_tasks(self) -> list[Task]:
+        """Planning tasks that build on the forecasts."""
+        return [
+            self.staffing_optimization_planning(),
+            self.supply_chain_inventory_management(),
+            self.patient_advisory_preparation(),
+        ]
+
     @task
     def festival_event_analysis(self) -> Task:
         return Task(
@@ -220,12 +534,24 @@ class HospitalSurgePredictionCrew:
             agent=self.epidemic_surveillance(),
         )
 
+    @task
+    def combined_forecast_analysis(self) -> Task:
+        return Task(
+            description=(
+                "Analyze festival-related surges, pollution health risks, and outbreak trends. "
+                "Return one report with separate Festival, Pollution, and Epidemic sections."
+            ),
+            expected_output="resources/forecasts/combined_surge_forecast.md",
+            agent=self.combined_forecaster(),
+        )
+
     @task
     def staffing_optimization_planning(self) -> Task:
         return Task(
             description="Optimize staffing based on forecasts.",
             expected_output="resources/plans/staffing_optimization.md",
             agent=self.staffing_optimizer(),
+            context=self._forecast_tasks(),
         )
 
     @task
@@ -234,6 +560,7 @@ class HospitalSurgePredictionCrew:
             description="Plan hospital inventory and supply chain.",
             expected_output="resources/plans/supply_chain_inventory.md",
             agent=self.supply_chain_inventory(),
+            context=self._forecast_tasks(),
         )
 
     @task
@@ -242,6 +569,7 @@ class HospitalSurgePredictionCrew:
             description="Generate patient advisories.",
             expected_output="resources/communications/patient_advisories/advisories.md",
             agent=self.patient_advisory_communication(),
+            context=self._forecast_tasks(),
         )
 
     @task
@@ -250,30 +578,50 @@ class HospitalSurgePredictionCrew:
             description="Integrate all reports into hospital preparedness document.",
             expected_output="resources/reports/hospital_preparedness_report.md",
             agent=self.central_orchestrator(),
+            context=self._forecast_tasks() + self._planning_tasks(),
         )
 
     # ---------- Crew ----------
     @crew
     def hospital_surge_crew(self) -> Crew:
+        tasks = self._forecast_tasks() + self._planning_tasks() + [self.hospital_preparedness_orchestration()]
+        return Crew(
+            agents=[t.agent for t in tasks],
+            tasks=tasks,
+            process=Process.sequential,
+            verbose=True,
+        )
+
+    # ---------- Concurrent pipeline ----------
+    def _single_task_crew(self, t: Task) -> Crew:
         return Crew(
-            agents=[
-                self.festival_event_forecaster(),
-                self.pollution_climate_health_risk(),
-                self.epidemic_surveillance(),
-                self.staffing_optimizer(),
-                self.supply_chain_inventory(),
-                self.patient_advisory_communication(),
-                self.central_orchestrator(),
-            ],
-            tasks=[
-                self.festival_event_analysis(),
-                self.pollution_health_risk_assessment(),
-                self.epidemic_outbreak_surveillance(),
-                self.staffing_optimization_planning(),
-                self.supply_chain_inventory_management(),
-                self.patient_advisory_preparation(),
-                self.hospital_preparedness_orchestration(),
-            ],
+            agents=[t.agent],
+            tasks=[t],
             process=Process.sequential,
             verbose=True,
         )
+
+    async def run_pipeline(self, inputs: dict):
+        """Run the crew in dependency phases, overlapping the independent tasks of each phase."""
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_TASKS)
+
+        loop = asyncio.get_running_loop()
+
+        async def run_task(t: Task):
+            # Each task is its own one-task crew; downstream tasks read earlier outputs via context
+            async with semaphore:
+                kickoff = functools.partial(self._single_task_crew(t).kickoff, inputs=inputs)
+                return await loop.run_in_executor(_CREW_POOL, contextvars.copy_context().run, kickoff)
+
+        async def run_phase(tasks: list[Task]):
+            # Schedule a whole phase before awaiting any of it so its LLM calls overlap.
+            # gather() does not stop the other kickoffs when one fails, so let them all finish
+            # before raising: a retry must not reuse these tasks and agents while they still run
+            results = await asyncio.gather(*(run_task(t) for t in tasks), return_exceptions=True)
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+
+        await run_phase(self._forecast_tasks())
+        await run_phase(self._planning_tasks())
+        return await run_task(self.hospital_preparedness_orchestration())
@@ -1,47 +1,50 @@
 #!/usr/bin/env python
+import sys
 import warnings
 
-# ✅ Suppress both DeprecationWarnings & Pydantic-specific warnings
-try:
-    from pydantic import PydanticDeprecatedSince20
-    warnings.filterwarnings("ignore", category=PydanticDeprecatedSince20)
-except ImportError:
-    pass
-
-warnings.filterwarnings("ignore", category=DeprecationWarning)
-warnings.filterwarnings("ignore", message=".*class-based.*config.*")
-warnings.filterwarnings("ignore", message=".*Support for class-based.*")
-warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
+# ✅ Suppress both DeprecationWarnings & Pydantic-specific warnings.
+# PydanticDeprecatedSince20 subclasses DeprecationWarning, so the category filter covers it.
+# Skipped when the user passed -W options, so those take effect unchanged
+if not sys.warnoptions:
+    warnings.filterwarnings("ignore", category=DeprecationWarning)
+    warnings.filterwarnings("ignore", message=".*(class-based.*config|Support for class-based)")
+    warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
 
-import sys
 import os
+import re
+import csv
+import random
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from dotenv import load_dotenv
-from hospital.crew import HospitalSurgePredictionCrew
+# Importing the crew also loads .env, which get_inputs() below relies on
+from hospital.crew import HospitalSurgePredictionCrew, MAX_CONCURRENT_RUNS
 
-# Load environment variables
-load_dotenv()
+# Crew inputs read from the environment (variable name is the upper-cased key) and their defaults
+INPUT_DEFAULTS = {
+    "hospital_name": "",
+    "region": "",
+    "historical_data_period": "2020-2024",
+    "current_season": "",
+    "surveillance_data": "Government health bulletins and hospital records",
+    "current_staffing": "",
+    "budget_constraints": "",
+    "current_inventory": "Standard hospital inventory levels",
+    "vendor_details": "Approved medical suppliers",
+    "regional_languages": "Hindi,English",
+    "administrator_name": "",
+    "emergency_contacts": "",
+}
+REQUIRED_FIELDS = ("hospital_name", "region", "current_staffing", "administrator_name")
 
 def get_inputs():
     """Get inputs from environment variables with validation."""
-    inputs = {
-        "hospital_name": os.getenv("HOSPITAL_NAME", ""),
-        "region": os.getenv("REGION", ""),
-        "historical_data_period": os.getenv("HISTORICAL_DATA_PERIOD", "2020-2024"),
-        "current_season": os.getenv("CURRENT_SEASON", ""),
-        "surveillance_data": os.getenv("SURVEILLANCE_DATA", "Government health bulletins and hospital records"),
-        "current_staffing": os.getenv("CURRENT_STAFFING", ""),
-        "budget_constraints": os.getenv("BUDGET_CONSTRAINTS", ""),
-        "current_inventory": os.getenv("CURRENT_INVENTORY", "Standard hospital inventory levels"),
-        "vendor_details": os.getenv("VENDOR_DETAILS", "Approved medical suppliers"),
-        "regional_languages": os.getenv("REGIONAL_LANGUAGES", "Hindi,English"),
-        "administrator_name": os.getenv("ADMINISTRATOR_NAME", ""),
-        "emergency_contacts": os.getenv("EMERGENCY_CONTACTS", ""),
-        "current_date": datetime.now().strftime("%Y-%m-%d"),
-    }
+    env = os.environ
+    inputs = {key: env.get(key.upper(), default) for key, default in INPUT_DEFAULTS.items()}
+    inputs["current_date"] = datetime.now().strftime("%Y-%m-%d")
     
-    required_fields = ["hospital_name", "region", "current_staffing", "administrator_name"]
-    missing_fields = [f for f in required_fields if not inputs[f]]
+    missing_fields = [f for f in REQUIRED_FIELDS if not inputs[f]]
     
     if missing_fields:
         print("❌ Error: Missing required environment variables:")
@@ -62,6 +65,32 @@ def get_inputs():
     
     return inputs
 
+# Failures another attempt cannot fix; these are raised straight away instead of retried
+NON_RETRYABLE = re.compile(r"api key|authentication|model.*(not found|invalid)", re.I)
+MAX_RETRIES = 3
+RETRY_BASE_DELAY = 5
+RETRY_MAX_DELAY = 30
+
+async def run_with_retry_async(crew, inputs, max_retries=MAX_RETRIES, base_delay=RETRY_BASE_DELAY):
+    """Run the crew pipeline, retrying transient failures with full-jitter backoff."""
+    # Checked once up front: no number of attempts fixes a missing input
+    missing = [f for f in REQUIRED_FIELDS if not inputs.get(f)]
+    if missing:
+        raise ValueError(f"Missing required inputs: {', '.join(missing)}")
+    for attempt in range(max_retries + 1):
+        try:
+            return await crew.run_pipeline(inputs)
+        except Exception as e:
+            if attempt == max_retries or NON_RETRYABLE.search(str(e)):
+                raise
+            delay = min(RETRY_MAX_DELAY, base_delay * 2 ** attempt) * random.random()
+            print(f"\n⚠️  Attempt {attempt + 1} failed: {e}. Retrying in {delay:.1f}s...")
+            await asyncio.sleep(delay)
+
+def run_with_retry(crew, inputs, **kwargs):
+    """Blocking wrapper around run_with_retry_async() for the CLI."""
+    return asyncio.run(run_with_retry_async(crew, inputs, **kwargs))
+
 def run():
     """Run the hospital surge prediction crew."""
     print("🚀 Starting Hospital Surge Prediction Analysis...")
@@ -77,7 +106,7 @@ def run():
         crew = HospitalSurgePredictionCrew()
         
         print("\n🔄 Initializing agents and tasks...")
-        result = crew.hospital_surge_crew().kickoff(inputs=inputs)
+        result = run_with_retry(crew, inputs)
         
         print("\n✅ Hospital surge prediction analysis completed successfully!")
         print(f"📊 Results have been saved to the reports directory.")
@@ -93,5 +122,59 @@ def run():
             print("\n💡 This usually means an API key or model issue.")
         raise
 
+def run_many(inputs_list, max_workers=MAX_CONCURRENT_RUNS):
+    """Run the crew for several hospitals at once, one fresh crew per input.
+
+    Agents keep conversation state, so crews are never shared between inputs; only the
+    module-level tools, HTTP client and LLM response cache are. Up to MAX_CONCURRENT_RUNS
+    runs get their full task concurrency; more workers than that share the task pool.
+
+    Returns one (inputs, result, error) tuple per input, in order; a failed run sets error
+    instead of stopping the others.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hospital-run") as ex:
+        futs = [(i, ex.submit(run_with_retry, HospitalSurgePredictionCrew(), i)) for i in inputs_list]
+    outcomes = []
+    for inputs, fut in futs:
+        try:
+            outcomes.append((inputs, fut.result(), None))
+        except Exception as e:
+            outcomes.append((inputs, None, e))
+    return outcomes
+
+def print_batch_summary(outcomes):
+    """Print one success/failure line per hospital; returns the number of failed runs."""
+    print("\n📋 Batch summary")
+    print("=" * 50)
+    failed = 0
+    for row, (inputs, result, error) in enumerate(outcomes, start=1):
+        name = inputs.get("hospital_name") or f"row {row}"
+        if error is None:
+            print(f"✅ {name}")
+        else:
+            failed += 1
+            print(f"❌ {name}: {error}")
+    print("=" * 50)
+    print(f"{len(outcomes) - failed} succeeded, {failed} failed")
+    return failed
+
+def read_input_csv(path):
+    """Read one crew input dict per CSV row, filling blank columns from INPUT_DEFAULTS."""
+    current_date = datetime.now().strftime("%Y-%m-%d")
+    with open(path, newline="", encoding="utf-8") as f:
+        return [
+            {**INPUT_DEFAULTS, **{k: v for k, v in row.items() if v}, "current_date": current_date}
+            for row in csv.DictReader(f)
+        ]
+
 if __name__ == "__main__":
-    run()
+    parser = argparse.ArgumentParser(description="Hospital surge prediction crew")
+    parser.add_argument("--input-csv", help="CSV with one hospital per row (columns are the crew input names)")
+    parser.add_argument("--max-workers", type=int, default=MAX_CONCURRENT_RUNS)
+    args = parser.parse_args()
+    if args.input_csv:
+        outcomes = run_many(read_input_csv(args.input_csv), max_workers=args.max_workers)
+        if print_batch_summary(outcomes):
+            sys.exit(1)
+    else:
+        run()